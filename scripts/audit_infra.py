@@ -1,20 +1,35 @@
-import boto3
 from botocore.exceptions import ClientError
 import json
 
+from aws_context import AwsContext
+
 # Cost configuration (Approximate prices for eu-west-3 if pricing API is not available)
 PRICING = {
     "t3.micro": 0.0118,
     "alb": 0.0243,
+    "alb_lcu": 0.008,  # per LCU-hour
     "nat_gateway": 0.048,
+    "nat_gateway_gb": 0.048,  # per GB processed
+    "db.t3.micro": 0.018,  # Single-AZ, doubled for Multi-AZ
+    "rds_gp2_gb_month": 0.133,
+    "s3_standard_gb_month": 0.024,
+    "ebs_gp2_gb_month": 0.116,
+    "ebs_gp3_gb_month": 0.0928,
+    "ebs_io1_gb_month": 0.145,
+    "ebs_io2_gb_month": 0.145,
+    "ebs_st1_gb_month": 0.052,
+    "ebs_sc1_gb_month": 0.0174,
+    "ebs_standard_gb_month": 0.058,
+    "ebs_snapshot_gb_month": 0.05,
 }
 
 
-def get_real_price(instance_type, region_code="eu-west-3"):
+def get_real_price(instance_type, region_code="eu-west-3", ctx=None):
     """
     Retrieve the On-Demand Linux price for a given instance in Paris.
     Requires a boto3 client on us-east-1.
     """
+    ctx = ctx or AwsContext()
     # Mapping of region names for the Pricing API
     region_map = {
         "eu-west-3": "EU (Paris)",
@@ -24,7 +39,7 @@ def get_real_price(instance_type, region_code="eu-west-3"):
     if not location:
         return 0.0
 
-    pricing_client = boto3.client("pricing", region_name="us-east-1")
+    pricing_client = ctx.client("pricing", region_name="us-east-1")
 
     try:
         response = pricing_client.get_products(
@@ -59,9 +74,10 @@ def get_real_price(instance_type, region_code="eu-west-3"):
         return 0.0
 
 
-def audit_compute():
+def audit_compute(ctx=None):
     """List the EC2 instances and check compliance."""
-    ec2 = boto3.resource("ec2")
+    ctx = ctx or AwsContext()
+    ec2 = ctx.resource("ec2")
 
     print("\n🖥️  AUDIT COMPUTE (EC2)")
     print("-" * 60)
@@ -78,6 +94,7 @@ def audit_compute():
         return 0
 
     hourly_cost = 0
+    prices = {}  # One Pricing API call per instance type, not per instance
     for i in instances:
         # Get the Name (Tag)
         name = "Inconnu"
@@ -87,25 +104,29 @@ def audit_compute():
                     name = tag["Value"]
 
         # Try to get the real price, otherwise use the approximate price
-        real_price = get_real_price(i.instance_type)
+        if i.instance_type not in prices:
+            prices[i.instance_type] = get_real_price(i.instance_type, ctx=ctx)
+        real_price = prices[i.instance_type]
 
         if real_price > 0:
-            hourly_cost = real_price
+            price = real_price
         else:
-            hourly_cost = PRICING.get(i.instance_type, 0.0)
+            price = PRICING.get(i.instance_type, 0.0)
+        hourly_cost += price
 
         print(
-            f"   ✅ {name:<30} | {i.instance_type:<10} | {i.placement['AvailabilityZone']:<10} | {hourly_cost}$/h"
+            f"   ✅ {name:<30} | {i.instance_type:<10} | {i.placement['AvailabilityZone']:<10} | {price}$/h"
         )
 
     print(f"   👉 Total Compute : {len(instances)} instances")
     return hourly_cost
 
 
-def audit_network_cost():
+def audit_network_cost(ctx=None):
     """Check the ALBs and NAT Gateways (which are expensive)."""
-    client = boto3.client("elbv2")
-    ec2_client = boto3.client("ec2")
+    ctx = ctx or AwsContext()
+    client = ctx.client("elbv2")
+    ec2_client = ctx.client("ec2")
 
     print("\n🌐 AUDIT NETWORK & FLOW")
     print("-" * 60)
@@ -132,9 +153,10 @@ def audit_network_cost():
     return cost
 
 
-def audit_security_groups():
+def audit_security_groups(ctx=None):
     """Check if the port 22 (SSH) is open to everyone (Security vulnerability)."""
-    ec2 = boto3.resource("ec2")
+    ctx = ctx or AwsContext()
+    ec2 = ctx.resource("ec2")
 
     print("\n🔒 AUDIT SECURITY (Security Groups)")
     print("-" * 60)
@@ -157,15 +179,18 @@ def audit_security_groups():
         print(f"   ⚠️  {issues_found} critical issue(s) detected.")
 
 
-if __name__ == "__main__":
+def run_audit(ctx=None):
+    """Run the full FinOps and security audit report."""
+    ctx = ctx or AwsContext()
+
     print("============================================================")
     print("      AUDIT REPORT INFRASTRUCTURE WEBMARKET+ (FINOPS)    ")
     print("============================================================")
 
     try:
-        total_ec2 = audit_compute()
-        total_net = audit_network_cost()
-        audit_security_groups()
+        total_ec2 = audit_compute(ctx)
+        total_net = audit_network_cost(ctx)
+        audit_security_groups(ctx)
 
         total_hourly = total_ec2 + total_net
         total_monthly = total_hourly * 24 * 30
@@ -178,3 +203,7 @@ if __name__ == "__main__":
 
     except ClientError as e:
         print(f"❌ AWS Error: {e}")
+
+
+if __name__ == "__main__":
+    run_audit()
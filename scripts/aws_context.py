@@ -0,0 +1,83 @@
+import os
+import sys
+
+
+TERRAFORM_DIR = os.path.join(
+    os.path.dirname(__file__), "../terraform"
+)  # Folder containing the Terraform files
+DEFAULT_REGION = "eu-west-3"
+
+
+class AwsContext:
+    """
+    Shared state for one run of the scripts: a single boto3 session, a cache of
+    clients/resources and the Terraform outputs (read once).
+    boto3 is only imported the first time a client or resource is requested.
+    """
+
+    def __init__(self, region_name=DEFAULT_REGION, profile_name=None):
+        self.region_name = region_name
+        self.profile_name = profile_name
+        self._session = None
+        self._clients = {}
+        self._resources = {}
+        self._outputs = None
+
+    @property
+    def session(self):
+        if self._session is None:
+            import boto3
+
+            self._session = boto3.session.Session(
+                region_name=self.region_name, profile_name=self.profile_name
+            )
+        return self._session
+
+    def client(self, service_name, region_name=None):
+        """Return a cached low-level client for the service (and region)."""
+        key = (service_name, region_name or self.region_name)
+        if key not in self._clients:
+            self._clients[key] = self.session.client(service_name, region_name=key[1])
+        return self._clients[key]
+
+    def resource(self, service_name, region_name=None):
+        """Return a cached resource for the service (and region)."""
+        key = (service_name, region_name or self.region_name)
+        if key not in self._resources:
+            self._resources[key] = self.session.resource(
+                service_name, region_name=key[1]
+            )
+        return self._resources[key]
+
+    def terraform_outputs(self):
+        """Get the outputs of Terraform in JSON format (only runs terraform once)."""
+        if self._outputs is None:
+            self._outputs = get_terraform_outputs()
+        return self._outputs
+
+    def terraform_output(self, name):
+        """Get the value of a single Terraform output, or None if it is missing."""
+        return self.terraform_outputs().get(name, {}).get("value")
+
+
+def get_terraform_outputs():
+    """Get the outputs of Terraform in JSON format."""
+    # Imported here to keep the CLI start-up ('--help') fast
+    import json
+    import subprocess
+
+    print(f"🔍 Reading Terraform configuration from {TERRAFORM_DIR}...")
+    try:
+        # Run 'terraform output -json' to get the real values
+        cmd = ["terraform", "output", "-json"]
+        result = subprocess.run(
+            cmd, cwd=TERRAFORM_DIR, capture_output=True, text=True, check=True
+        )
+        return json.loads(result.stdout)
+    except subprocess.CalledProcessError:
+        print("❌ Error: Unable to read Terraform outputs.")
+        print("Make sure you ran 'terraform apply' first.")
+        sys.exit(1)
+    except FileNotFoundError:
+        print("❌ Error: 'terraform' command not found.")
+        sys.exit(1)
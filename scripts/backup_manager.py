@@ -1,34 +1,8 @@
-import boto3
 from botocore.exceptions import ClientError
 import datetime
-import json
-import subprocess
-import os
 import sys
 
-
-TERRAFORM_DIR = os.path.join(
-    os.path.dirname(__file__), "../terraform"
-)  # Folder containing the Terraform files
-
-
-def get_terraform_outputs():
-    """Get the outputs of Terraform in JSON format."""
-    print(f"🔍 Reading Terraform configuration from {TERRAFORM_DIR}...")
-    try:
-        # Run 'terraform output -json' to get the real values
-        cmd = ["terraform", "output", "-json"]
-        result = subprocess.run(
-            cmd, cwd=TERRAFORM_DIR, capture_output=True, text=True, check=True
-        )
-        return json.loads(result.stdout)
-    except subprocess.CalledProcessError:
-        print("❌ Error: Unable to read Terraform outputs.")
-        print("Make sure you ran 'terraform apply' first.")
-        sys.exit(1)
-    except FileNotFoundError:
-        print("❌ Error: 'terraform' command not found.")
-        sys.exit(1)
+from aws_context import AwsContext
 
 
 def find_db_instance_by_endpoint(rds, endpoint):
@@ -67,17 +41,17 @@ def find_db_instance_by_endpoint(rds, endpoint):
         return None
 
 
-def create_rds_snapshot():
+def create_rds_snapshot(ctx=None):
     """
     Create a snapshot of the RDS database instance.
     The snapshot ID includes a timestamp for uniqueness.
     """
-    rds = boto3.client("rds", region_name="eu-west-3")
+    ctx = ctx or AwsContext()
+    rds = ctx.client("rds")
 
     # Get the database instance identifier from Terraform outputs
-    outputs = get_terraform_outputs()
-    db_instance_id = outputs.get("rds_instance_id", {}).get("value")
-    rds_endpoint = outputs.get("rds_endpoint", {}).get("value")
+    db_instance_id = ctx.terraform_output("rds_instance_id")
+    rds_endpoint = ctx.terraform_output("rds_endpoint")
 
     if not db_instance_id:
         print("❌ Error: 'rds_instance_id' output not found in Terraform.")
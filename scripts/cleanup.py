@@ -1,33 +1,8 @@
-import boto3
 from botocore.exceptions import ClientError
 from datetime import datetime, timezone, timedelta
-import json
-import subprocess
-import os
 import sys
 
-
-TERRAFORM_DIR = os.path.join(
-    os.path.dirname(__file__), "../terraform"
-)  # Folder containing the Terraform files
-
-
-def get_terraform_outputs():
-    """Get the outputs of Terraform in JSON format."""
-    try:
-        # Run 'terraform output -json' to get the real values
-        cmd = ["terraform", "output", "-json"]
-        result = subprocess.run(
-            cmd, cwd=TERRAFORM_DIR, capture_output=True, text=True, check=True
-        )
-        return json.loads(result.stdout)
-    except subprocess.CalledProcessError:
-        print("❌ Error: Unable to read Terraform outputs.")
-        print("Make sure you ran 'terraform apply' first.")
-        sys.exit(1)
-    except FileNotFoundError:
-        print("❌ Error: 'terraform' command not found.")
-        sys.exit(1)
+from aws_context import AwsContext
 
 
 def find_db_instance_by_endpoint(rds, endpoint):
@@ -66,11 +41,10 @@ def find_db_instance_by_endpoint(rds, endpoint):
         return None
 
 
-def get_db_instance_id(rds):
+def get_db_instance_id(rds, ctx):
     """Get the actual database instance ID from Terraform outputs."""
-    outputs = get_terraform_outputs()
-    db_instance_id = outputs.get("rds_instance_id", {}).get("value")
-    rds_endpoint = outputs.get("rds_endpoint", {}).get("value")
+    db_instance_id = ctx.terraform_output("rds_instance_id")
+    rds_endpoint = ctx.terraform_output("rds_endpoint")
 
     if not db_instance_id:
         print("❌ Error: 'rds_instance_id' output not found in Terraform.")
@@ -97,17 +71,19 @@ def get_db_instance_id(rds):
             sys.exit(1)
 
 
-def cleanup_old_snapshots(days_retention=7):
+def cleanup_old_snapshots(days_retention=7, ctx=None):
     """
     Delete old RDS manual snapshots older than the specified retention period.
 
     Args:
         days_retention: Number of days to retain snapshots (default: 7)
+        ctx: Shared AwsContext (a new one is created if not provided)
     """
-    rds = boto3.client("rds", region_name="eu-west-3")
+    ctx = ctx or AwsContext()
+    rds = ctx.client("rds")
 
     # Get the database instance identifier
-    db_instance_id = get_db_instance_id(rds)
+    db_instance_id = get_db_instance_id(rds, ctx)
     print(f"📋 Target database instance: {db_instance_id}")
 
     # Calculate the cutoff date: today minus retention days
@@ -0,0 +1,433 @@
+from botocore.exceptions import ClientError
+from datetime import datetime, timezone, timedelta
+import math
+import numpy as np
+
+from audit_infra import PRICING, get_real_price
+from aws_context import AwsContext
+
+
+HOURS_PER_MONTH = 730  # AWS bills "monthly" prices on 730 hours
+RUN_RATE_HOURS = 24  # The projection extrapolates the cost of the last 24h of data
+MAX_QUERIES_PER_CALL = 500  # GetMetricData limit
+
+
+def default_period(start):
+    """
+    Pick the finest period CloudWatch still keeps for the requested window
+    (1 min for 15 days, 5 min for 63 days, 1 hour for 455 days).
+    """
+    age = datetime.now(timezone.utc) - start
+    if age <= timedelta(days=15):
+        return 60
+    if age <= timedelta(days=63):
+        return 300
+    return 3600
+
+
+def metric_period(start, period=None):
+    """
+    Pick the period of the metrics starting at 'start': the requested one,
+    rounded up to a whole minute and to the finest period still kept for that
+    age (a finer period would silently return no data for the older part).
+    """
+    finest = default_period(start)
+    if not period:
+        return finest
+    return max(math.ceil(period / 60) * 60, finest)
+
+
+def metric_query(query_id, namespace, metric_name, dimensions, stat, period):
+    """Build one MetricDataQuery for GetMetricData."""
+    return {
+        "Id": query_id,
+        "MetricStat": {
+            "Metric": {
+                "Namespace": namespace,
+                "MetricName": metric_name,
+                "Dimensions": [
+                    {"Name": name, "Value": value} for name, value in dimensions.items()
+                ],
+            },
+            "Period": period,
+            "Stat": stat,
+        },
+        "ReturnData": True,
+    }
+
+
+def discover_resources(ctx):
+    """
+    List the billable resources and describe, for each one, the metrics to fetch
+    and how to turn every datapoint into dollars.
+
+    Each resource is a dict with:
+        service, name: labels for the report
+        region: region where its metrics are published
+        period: fixed period (seconds) of its metrics, None for the query period
+        metrics: list of (namespace, metric, dimensions, stat, scale, cap), the cost
+                 of a datapoint being min(value, cap) * scale, times the hours
+                 covered by the datapoint unless the stat is a 'Sum'
+        hourly: fixed cost per hour while the resource exists
+        created: creation date (fixed costs are not counted before it)
+    """
+    resources = []
+
+    # Auto Scaling Groups: instance-hours from the number of InService instances
+    # (requires the group metrics collection to be enabled on the ASG)
+    prices = {}
+    autoscaling = ctx.client("autoscaling")
+    for page in autoscaling.get_paginator("describe_auto_scaling_groups").paginate():
+        for group in page["AutoScalingGroups"]:
+            instance_type = next(
+                (i["InstanceType"] for i in group["Instances"] if "InstanceType" in i),
+                "t3.micro",
+            )
+            if instance_type not in prices:
+                real_price = get_real_price(instance_type, ctx.region_name, ctx=ctx)
+                prices[instance_type] = real_price or PRICING.get(instance_type, 0.0)
+            dimensions = {"AutoScalingGroupName": group["AutoScalingGroupName"]}
+            resources.append(
+                {
+                    "service": "EC2 (ASG)",
+                    "name": group["AutoScalingGroupName"],
+                    "region": ctx.region_name,
+                    "period": None,
+                    "metrics": [
+                        (
+                            "AWS/AutoScaling",
+                            "GroupInServiceInstances",
+                            dimensions,
+                            "Average",
+                            prices[instance_type],
+                            None,
+                        )
+                    ],
+                    "hourly": 0.0,
+                    "created": group["CreatedTime"],
+                }
+            )
+
+    # Load Balancers: fixed hourly price + LCU-hours
+    elbv2 = ctx.client("elbv2")
+    for page in elbv2.get_paginator("describe_load_balancers").paginate():
+        for alb in page["LoadBalancers"]:
+            # NLBs/GWLBs have other prices and no AWS/ApplicationELB metrics
+            if alb["Type"] != "application":
+                continue
+            dimensions = {
+                "LoadBalancer": alb["LoadBalancerArn"].split(":loadbalancer/")[1]
+            }
+            resources.append(
+                {
+                    "service": "ALB",
+                    "name": alb["LoadBalancerName"],
+                    "region": ctx.region_name,
+                    "period": None,
+                    "metrics": [
+                        (
+                            "AWS/ApplicationELB",
+                            "ConsumedLCUs",
+                            dimensions,
+                            "Average",
+                            PRICING["alb_lcu"],
+                            None,
+                        )
+                    ],
+                    "hourly": PRICING["alb"],
+                    "created": alb["CreatedTime"],
+                }
+            )
+
+    # NAT Gateways: fixed hourly price + GB processed (both directions)
+    ec2 = ctx.client("ec2")
+    nat_pages = ec2.get_paginator("describe_nat_gateways").paginate(
+        Filter=[{"Name": "state", "Values": ["available"]}]
+    )
+    for page in nat_pages:
+        for nat in page["NatGateways"]:
+            dimensions = {"NatGatewayId": nat["NatGatewayId"]}
+            per_byte = PRICING["nat_gateway_gb"] / 1e9
+            resources.append(
+                {
+                    "service": "NAT Gateway",
+                    "name": nat["NatGatewayId"],
+                    "region": ctx.region_name,
+                    "period": None,
+                    "metrics": [
+                        ("AWS/NATGateway", metric, dimensions, "Sum", per_byte, None)
+                        for metric in (
+                            "BytesOutToDestination",
+                            "BytesInFromDestination",
+                        )
+                    ],
+                    "hourly": PRICING["nat_gateway"],
+                    "created": nat["CreateTime"],
+                }
+            )
+
+    # RDS: instance-hours (periods with CPU datapoints) + allocated storage
+    rds = ctx.client("rds")
+    for page in rds.get_paginator("describe_db_instances").paginate():
+        for db in page["DBInstances"]:
+            az_factor = 2 if db.get("MultiAZ") else 1
+            dimensions = {"DBInstanceIdentifier": db["DBInstanceIdentifier"]}
+            storage_hourly = (
+                db["AllocatedStorage"] * PRICING["rds_gp2_gb_month"] / HOURS_PER_MONTH
+            )
+            resources.append(
+                {
+                    "service": "RDS",
+                    "name": db["DBInstanceIdentifier"],
+                    "region": ctx.region_name,
+                    "period": None,
+                    "metrics": [
+                        (
+                            "AWS/RDS",
+                            "CPUUtilization",
+                            dimensions,
+                            "SampleCount",
+                            PRICING.get(db["DBInstanceClass"], 0.0) * az_factor,
+                            1,
+                        )
+                    ],
+                    "hourly": storage_hourly * az_factor,
+                    "created": db.get("InstanceCreateTime"),
+                }
+            )
+
+    # S3: Standard storage (the metric is only published once a day, in the
+    # region of the bucket, and the list covers the buckets of every region)
+    s3 = ctx.client("s3")
+    for page in s3.get_paginator("list_buckets").paginate():
+        for bucket in page["Buckets"]:
+            region = bucket.get("BucketRegion")
+            if not region:
+                location = s3.get_bucket_location(Bucket=bucket["Name"])
+                region = location["LocationConstraint"] or "us-east-1"
+            dimensions = {
+                "BucketName": bucket["Name"],
+                "StorageType": "StandardStorage",
+            }
+            resources.append(
+                {
+                    "service": "S3",
+                    "name": bucket["Name"],
+                    "region": region,
+                    "period": 86400,
+                    "metrics": [
+                        (
+                            "AWS/S3",
+                            "BucketSizeBytes",
+                            dimensions,
+                            "Average",
+                            PRICING["s3_standard_gb_month"] / HOURS_PER_MONTH / 1e9,
+                            None,
+                        )
+                    ],
+                    "hourly": 0.0,
+                    "created": bucket.get("CreationDate"),
+                }
+            )
+
+    return resources
+
+
+def fetch_metric_data(cloudwatch, queries, start, end):
+    """
+    Run the queries in batched GetMetricData calls (500 queries per call, pages
+    followed with the paginator).
+    Returns {query id: (timestamps in epoch seconds, values)} as numpy arrays.
+    """
+    series = {query["Id"]: ([], []) for query in queries}
+    paginator = cloudwatch.get_paginator("get_metric_data")
+
+    for i in range(0, len(queries), MAX_QUERIES_PER_CALL):
+        pages = paginator.paginate(
+            MetricDataQueries=queries[i : i + MAX_QUERIES_PER_CALL],
+            StartTime=start,
+            EndTime=end,
+            ScanBy="TimestampAscending",
+        )
+        for page in pages:
+            for result in page["MetricDataResults"]:
+                timestamps, values = series[result["Id"]]
+                timestamps.extend(t.timestamp() for t in result["Timestamps"])
+                values.extend(result["Values"])
+
+    return {
+        query_id: (np.asarray(timestamps, dtype=float), np.asarray(values, dtype=float))
+        for query_id, (timestamps, values) in series.items()
+    }
+
+
+def summarize_costs(timestamps, costs, period, hourly, created, end, start=None):
+    """
+    Compute the month-to-date and projected costs of one resource from
+    the cost of each of its datapoints. With a window 'start', also the cost
+    over the window and the average monthly cost it represents.
+    """
+    month_start = end.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    next_month = (month_start + timedelta(days=32)).replace(day=1)
+    remaining_hours = (next_month - end).total_seconds() / 3600
+
+    def hours_since(moment):
+        if created and created > moment:
+            moment = created
+        return max((end - moment).total_seconds() / 3600, 0.0)
+
+    def cost_since(moment):
+        usage = costs[timestamps >= moment.timestamp()].sum()
+        return usage + hourly * hours_since(moment)
+
+    mtd = cost_since(month_start)
+
+    run_rate = hourly
+    if timestamps.size:
+        last = timestamps.max()
+        recent = timestamps > last - RUN_RATE_HOURS * 3600
+        covered = min(RUN_RATE_HOURS * 3600, last - timestamps.min() + period)
+        run_rate += costs[recent].sum() * 3600 / covered
+
+    summary = {
+        "mtd": float(mtd),
+        "projected": float(mtd + run_rate * remaining_hours),
+    }
+    if start is not None:
+        window = cost_since(start)
+        window_hours = (end - start).total_seconds() / 3600
+        summary["window"] = float(window)
+        summary["monthly_average"] = float(window * HOURS_PER_MONTH / window_hours)
+    return summary
+
+
+def estimate_costs(ctx=None, days=None, period=None, end=None):
+    """
+    Estimate the cost of every resource from its CloudWatch usage.
+
+    Args:
+        ctx: Shared AwsContext (a new one is created if not provided)
+        days: History window in days, reported as a total and an average monthly
+              cost (default: no window, month-to-date and projection only)
+        period: Metric period in seconds (default: finest period available)
+        end: End of the window (default: now)
+    """
+    ctx = ctx or AwsContext()
+    end = end or datetime.now(timezone.utc)
+    month_start = end.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    start = end - timedelta(days=days) if days else None
+
+    resources = discover_resources(ctx)
+    for resource in resources:
+        resource["timestamps"], resource["costs"] = [], []
+
+    # The month is fetched on its own so that a long history (coarser period)
+    # does not lower the resolution of the month-to-date and the projection
+    segments = [(month_start, end)]
+    if start and start < month_start:
+        segments.append((start, month_start))
+
+    month_period = metric_period(month_start, period)
+    for segment_start, segment_end in segments:
+        segment_period = metric_period(segment_start, period)
+        if period and segment_period != period:
+            print(
+                f"ℹ️  Period rounded up to {segment_period} s for the data since "
+                f"{segment_start:%Y-%m-%d} (CloudWatch retention)"
+            )
+
+        # One query per metric, the resources of a region fetched together
+        queries = {}
+        for resource in resources:
+            resource["queries"] = []
+            resource_period = resource["period"] or segment_period
+            region_queries = queries.setdefault(resource["region"], [])
+            for namespace, metric, dimensions, stat, scale, cap in resource["metrics"]:
+                query_id = f"m{len(region_queries)}"
+                region_queries.append(
+                    metric_query(
+                        query_id, namespace, metric, dimensions, stat, resource_period
+                    )
+                )
+                if stat != "Sum":
+                    scale *= resource_period / 3600
+                resource["queries"].append((query_id, scale, cap))
+
+        series = {}
+        for region, region_queries in queries.items():
+            cloudwatch = ctx.client("cloudwatch", region_name=region)
+            series[region] = fetch_metric_data(
+                cloudwatch, region_queries, segment_start, segment_end
+            )
+
+        for resource in resources:
+            for query_id, scale, cap in resource["queries"]:
+                timestamps, values = series[resource["region"]][query_id]
+                if cap is not None:
+                    values = np.minimum(values, cap)
+                resource["timestamps"].append(timestamps)
+                resource["costs"].append(values * scale)
+
+    report = []
+    for resource in resources:
+        summary = summarize_costs(
+            np.concatenate(resource["timestamps"]),
+            np.concatenate(resource["costs"]),
+            resource["period"] or month_period,
+            resource["hourly"],
+            resource["created"],
+            end,
+            start,
+        )
+        report.append(
+            {"service": resource["service"], "name": resource["name"], **summary}
+        )
+
+    return report
+
+
+def run_cost_report(ctx=None, days=None, period=None):
+    """Print the month-to-date and projected cost of every resource."""
+    print("============================================================")
+    print("      COST REPORT INFRASTRUCTURE WEBMARKET+ (USAGE)         ")
+    print("============================================================")
+
+    try:
+        report = estimate_costs(ctx, days, period)
+    except ClientError as e:
+        print(f"❌ AWS Error: {e}")
+        return
+
+    if not report:
+        print("   No billable resources detected.")
+        return
+
+    header = f"   {'Service':<12} | {'Resource':<32} | {'MTD':>9} | {'Projected':>9}"
+    if days:
+        header += f" | {f'{days} days':>9} | {'Avg/month':>9}"
+    print(header)
+    print("-" * len(header))
+    for line in sorted(report, key=lambda line: line["projected"], reverse=True):
+        row = (
+            f"   {line['service']:<12} | {line['name'][:32]:<32} | "
+            f"{line['mtd']:>8.2f}$ | {line['projected']:>8.2f}$"
+        )
+        if days:
+            row += f" | {line['window']:>8.2f}$ | {line['monthly_average']:>8.2f}$"
+        print(row)
+
+    total_mtd = sum(line["mtd"] for line in report)
+    total_projected = sum(line["projected"] for line in report)
+    print("=" * len(header))
+    print(f"   Month-to-date cost: {total_mtd:.2f} $")
+    print(f"   Projected cost for the month: {total_projected:.2f} $ / month")
+    if days:
+        total_window = sum(line["window"] for line in report)
+        total_average = sum(line["monthly_average"] for line in report)
+        print(f"   Cost over the last {days} days: {total_window:.2f} $")
+        print(f"   Average monthly cost: {total_average:.2f} $ / month")
+    print("============================================================")
+
+
+if __name__ == "__main__":
+    run_cost_report()
@@ -1,13 +1,15 @@
-import boto3
 import sys
 
+from aws_context import AwsContext
 
-def manage_instances(action):
+
+def manage_instances(action, ctx=None):
     """
     Start or stop EC2 instances based on the specified action.
     Only targets instances tagged with Environment='dev'.
     """
-    ec2 = boto3.resource("ec2", region_name="eu-west-3")
+    ctx = ctx or AwsContext()
+    ec2 = ctx.resource("ec2")
 
     filters = [
         {"Name": "tag:Environment", "Values": ["dev"]},
@@ -0,0 +1,640 @@
+from botocore.exceptions import BotoCoreError, ClientError
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import json
+import os
+import sys
+
+from aws_context import AwsContext, TERRAFORM_DIR
+
+
+STATE_FILE = os.path.join(TERRAFORM_DIR, "terraform.tfstate")  # Local backend
+MAX_WORKERS = 16  # Describe calls running at the same time
+BATCH_SIZE = 100  # Identifiers per describe call
+
+
+def load_state(path=STATE_FILE):
+    """
+    Read the Terraform state file and return the managed resources as a list of
+    (address, type, attributes).
+    """
+    try:
+        with open(path) as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        print(f"❌ Error: Terraform state not found at {path}.")
+        print("Make sure you ran 'terraform apply' first.")
+        sys.exit(1)
+
+    resources = []
+    for resource in state.get("resources", []):
+        if resource.get("mode") != "managed":
+            continue
+        for instance in resource.get("instances", []):
+            address = f"{resource['type']}.{resource['name']}"
+            if "index_key" in instance:
+                address += f"[{json.dumps(instance['index_key'])}]"
+            resources.append((address, resource["type"], instance["attributes"]))
+    return resources
+
+
+def get_path(attributes, path):
+    """Read a nested state attribute such as 'health_check.0.path'."""
+    value = attributes
+    for key in path.split("."):
+        if isinstance(value, list):
+            value = value[int(key)] if int(key) < len(value) else None
+        elif isinstance(value, dict):
+            value = value.get(key)
+        if value is None:
+            return None
+    return value
+
+
+def normalize(value):
+    """Make state and API values comparable (lists as sorted strings, '' as None)."""
+    if isinstance(value, (list, tuple, set)):
+        return sorted(str(v) for v in value) or None
+    if value is None or value == "":
+        return None
+    return str(value)
+
+
+# --- EC2 -------------------------------------------------------------------
+
+
+def rule_sources(protocol, from_port, to_port, sources):
+    return [f"{protocol}:{from_port}-{to_port}:{source}" for source in sources]
+
+
+def state_rules(key):
+    """Flatten the inline ingress/egress rules of an aws_security_group."""
+
+    def convert(attributes):
+        rules = []
+        for rule in attributes.get(key) or []:
+            sources = (
+                (rule.get("cidr_blocks") or [])
+                + (rule.get("ipv6_cidr_blocks") or [])
+                + (rule.get("prefix_list_ids") or [])
+                + (rule.get("security_groups") or [])
+            )
+            if rule.get("self"):
+                sources.append(attributes["id"])
+            rules += rule_sources(
+                rule["protocol"], rule["from_port"], rule["to_port"], sources
+            )
+        return rules
+
+    return convert
+
+
+def live_rules(permissions):
+    rules = []
+    for perm in permissions:
+        sources = (
+            [r["CidrIp"] for r in perm.get("IpRanges", [])]
+            + [r["CidrIpv6"] for r in perm.get("Ipv6Ranges", [])]
+            + [r["PrefixListId"] for r in perm.get("PrefixListIds", [])]
+            + [r["GroupId"] for r in perm.get("UserIdGroupPairs", [])]
+        )
+        rules += rule_sources(
+            perm["IpProtocol"], perm.get("FromPort", 0), perm.get("ToPort", 0), sources
+        )
+    return rules
+
+
+ROUTE_TARGETS = [
+    ("gateway_id", "GatewayId"),
+    ("nat_gateway_id", "NatGatewayId"),
+    ("transit_gateway_id", "TransitGatewayId"),
+    ("vpc_peering_connection_id", "VpcPeeringConnectionId"),
+    ("network_interface_id", "NetworkInterfaceId"),
+    ("vpc_endpoint_id", "VpcEndpointId"),
+]
+
+
+def state_routes(attributes):
+    routes = []
+    for route in attributes.get("route") or []:
+        destination = route.get("cidr_block") or route.get("ipv6_cidr_block")
+        target = next((route[k] for k, _ in ROUTE_TARGETS if route.get(k)), None)
+        routes.append(f"{destination}->{target}")
+    return routes
+
+
+def live_routes(routes):
+    # The 'local' route is created with the table and not part of the state
+    return [
+        f"{r.get('DestinationCidrBlock') or r.get('DestinationIpv6CidrBlock')}->"
+        f"{next((r[k] for _, k in ROUTE_TARGETS if r.get(k)), None)}"
+        for r in routes
+        if r.get("Origin") != "CreateRouteTable"
+    ]
+
+
+def ec2_check(method, result_key, id_field, id_filter, convert, **options):
+    """
+    Build the check of an EC2 resource type. The same describe call is used with
+    an id filter (state resources) and a tag filter (extra resources).
+    """
+    filter_param = options.pop("filter_param", "Filters")
+    ids_param = options.pop("ids_param", None)
+    not_found = options.pop("not_found", None)
+    skip = options.pop("skip", None)
+
+    def fetch(client, **kwargs):
+        if client.can_paginate(method):
+            pages = client.get_paginator(method).paginate(**kwargs)
+        else:
+            pages = [getattr(client, method)(**kwargs)]
+        return {
+            item[id_field]: convert(item)
+            for page in pages
+            for item in page[result_key]
+            if not (skip and skip(item))
+        }
+
+    def fetch_ids(client, ids):
+        try:
+            return fetch(client, **{ids_param: ids})
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") != not_found:
+                raise
+        # One unknown id fails the whole call: describe them one by one
+        if len(ids) == 1:
+            return {}
+        found = {}
+        for resource_id in ids:
+            found.update(fetch_ids(client, [resource_id]))
+        return found
+
+    def describe(client, ids):
+        if ids_param:
+            return fetch_ids(client, ids)
+        return fetch(client, **{filter_param: [{"Name": id_filter, "Values": ids}]})
+
+    def list_tagged(client, project):
+        tag_filter = [{"Name": "tag:Project", "Values": [project]}]
+        return set(fetch(client, **{filter_param: tag_filter}))
+
+    return {
+        "service": "ec2",
+        "describe": describe,
+        "list_tagged": list_tagged,
+        **options,
+    }
+
+
+# --- ELBv2 -----------------------------------------------------------------
+
+
+def elbv2_check(method, result_key, arn_field, convert):
+    """
+    Build the check of an ELBv2 resource type. There is no id filter: the account
+    is listed once and used both for the state resources and the extra ones.
+    """
+
+    def describe_all(client, ids, project):
+        pages = client.get_paginator(method).paginate()
+        items = {item[arn_field]: item for page in pages for item in page[result_key]}
+        found = {arn: convert(items[arn]) for arn in ids if arn in items}
+        if not project:
+            return found, set()
+
+        arns = list(items)
+        tagged = set()
+        for i in range(0, len(arns), 20):  # DescribeTags accepts 20 ARNs per call
+            response = client.describe_tags(ResourceArns=arns[i : i + 20])
+            for description in response["TagDescriptions"]:
+                tags = {t["Key"]: t["Value"] for t in description["Tags"]}
+                if tags.get("Project") == project:
+                    tagged.add(description["ResourceArn"])
+        return found, tagged
+
+    return {"service": "elbv2", "describe_all": describe_all}
+
+
+def describe_listeners(client, ids):
+    """Describe listeners through their load balancer (unknown ARNs fail the call)."""
+    found = {}
+    load_balancers = {
+        arn.replace(":listener/", ":loadbalancer/").rsplit("/", 1)[0] for arn in ids
+    }
+    for lb_arn in load_balancers:
+        try:
+            pages = client.get_paginator("describe_listeners").paginate(
+                LoadBalancerArn=lb_arn
+            )
+            for page in pages:
+                for listener in page["Listeners"]:
+                    found[listener["ListenerArn"]] = {
+                        "port": listener["Port"],
+                        "protocol": listener["Protocol"],
+                        "default_action.0.target_group_arn": listener["DefaultActions"][
+                            0
+                        ].get("TargetGroupArn"),
+                    }
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") != "LoadBalancerNotFound":
+                raise
+    return {arn: attrs for arn, attrs in found.items() if arn in ids}
+
+
+# --- RDS -------------------------------------------------------------------
+
+
+def convert_db_instance(db):
+    return {
+        "identifier": db["DBInstanceIdentifier"],
+        "instance_class": db["DBInstanceClass"],
+        "engine_version_actual": db["EngineVersion"],
+        "allocated_storage": db["AllocatedStorage"],
+        "storage_type": db["StorageType"],
+        "multi_az": db["MultiAZ"],
+    }
+
+
+def describe_db_instances(client, ids):
+    # The state id of aws_db_instance is the resource id (db-XXXX), not the identifier
+    pages = client.get_paginator("describe_db_instances").paginate(
+        Filters=[{"Name": "dbi-resource-id", "Values": ids}]
+    )
+    return {
+        db["DbiResourceId"]: convert_db_instance(db)
+        for page in pages
+        for db in page["DBInstances"]
+    }
+
+
+def list_tagged_db_instances(client, project):
+    pages = client.get_paginator("describe_db_instances").paginate()
+    return {
+        db["DbiResourceId"]
+        for page in pages
+        for db in page["DBInstances"]
+        if {t["Key"]: t["Value"] for t in db.get("TagList", [])}.get("Project")
+        == project
+    }
+
+
+def describe_db_subnet_groups(client, ids):
+    pages = client.get_paginator("describe_db_subnet_groups").paginate()
+    return {
+        group["DBSubnetGroupName"]: {
+            "subnet_ids": [s["SubnetIdentifier"] for s in group["Subnets"]]
+        }
+        for page in pages
+        for group in page["DBSubnetGroups"]
+        if group["DBSubnetGroupName"] in ids
+    }
+
+
+# --- S3 (one bucket per call) ----------------------------------------------
+
+
+def s3_check(read):
+    """Build the check of a per-bucket S3 resource type."""
+
+    def describe(client, ids):
+        found = {}
+        for bucket in ids:
+            try:
+                found[bucket] = read(client, bucket)
+            except ClientError as e:
+                code = e.response.get("Error", {}).get("Code", "")
+                if code in (
+                    "404",
+                    "NoSuchBucket",
+                    "NoSuchPublicAccessBlockConfiguration",
+                ):
+                    continue
+                raise
+        return found
+
+    return {"service": "s3", "describe": describe, "batch_size": 1}
+
+
+def read_bucket(client, bucket):
+    response = client.head_bucket(Bucket=bucket)
+    return {"region": response.get("BucketRegion")}
+
+
+def read_bucket_versioning(client, bucket):
+    response = client.get_bucket_versioning(Bucket=bucket)
+    return {"versioning_configuration.0.status": response.get("Status", "Disabled")}
+
+
+def read_public_access_block(client, bucket):
+    config = client.get_public_access_block(Bucket=bucket)[
+        "PublicAccessBlockConfiguration"
+    ]
+    return {
+        "block_public_acls": config["BlockPublicAcls"],
+        "block_public_policy": config["BlockPublicPolicy"],
+        "ignore_public_acls": config["IgnorePublicAcls"],
+        "restrict_public_buckets": config["RestrictPublicBuckets"],
+    }
+
+
+# --- Auto Scaling ----------------------------------------------------------
+
+
+def describe_auto_scaling_groups(client, ids):
+    pages = client.get_paginator("describe_auto_scaling_groups").paginate(
+        AutoScalingGroupNames=ids
+    )
+    # desired_capacity is not compared: the target tracking policy changes it
+    return {
+        group["AutoScalingGroupName"]: {
+            "min_size": group["MinSize"],
+            "max_size": group["MaxSize"],
+            "vpc_zone_identifier": group["VPCZoneIdentifier"].split(","),
+            "target_group_arns": group["TargetGroupARNs"],
+            "launch_template.0.id": group.get("LaunchTemplate", {}).get(
+                "LaunchTemplateId"
+            ),
+            "launch_template.0.version": group.get("LaunchTemplate", {}).get("Version"),
+        }
+        for page in pages
+        for group in page["AutoScalingGroups"]
+    }
+
+
+# Resource type -> how to describe it. Each check provides:
+#   service: boto3 client to use
+#   describe(client, ids): {id: live attributes} for the ids that still exist,
+#       attribute names being state attribute paths
+#   list_tagged(client, project) (optional): ids of the live resources tagged
+#       with the project, to find the ones missing from the state
+#   describe_all(client, ids, project) (instead of the two above): both results,
+#       (found, tagged), in one task for the types that can only be listed whole
+#   state (optional): {attribute: function(state attributes)} for the attributes
+#       that cannot be read directly from the state
+#   batch_size (optional): ids per describe call
+CHECKS = {
+    "aws_vpc": ec2_check(
+        "describe_vpcs",
+        "Vpcs",
+        "VpcId",
+        "vpc-id",
+        lambda vpc: {"cidr_block": vpc["CidrBlock"]},
+    ),
+    "aws_subnet": ec2_check(
+        "describe_subnets",
+        "Subnets",
+        "SubnetId",
+        "subnet-id",
+        lambda subnet: {
+            "cidr_block": subnet["CidrBlock"],
+            "availability_zone": subnet["AvailabilityZone"],
+            "vpc_id": subnet["VpcId"],
+            "map_public_ip_on_launch": subnet["MapPublicIpOnLaunch"],
+        },
+    ),
+    "aws_security_group": ec2_check(
+        "describe_security_groups",
+        "SecurityGroups",
+        "GroupId",
+        "group-id",
+        lambda sg: {
+            "name": sg["GroupName"],
+            "vpc_id": sg.get("VpcId"),
+            "ingress": live_rules(sg["IpPermissions"]),
+            "egress": live_rules(sg["IpPermissionsEgress"]),
+        },
+        state={"ingress": state_rules("ingress"), "egress": state_rules("egress")},
+    ),
+    "aws_internet_gateway": ec2_check(
+        "describe_internet_gateways",
+        "InternetGateways",
+        "InternetGatewayId",
+        "internet-gateway-id",
+        lambda igw: {
+            "vpc_id": next((a["VpcId"] for a in igw.get("Attachments", [])), None)
+        },
+    ),
+    "aws_eip": ec2_check(
+        "describe_addresses",
+        "Addresses",
+        "AllocationId",
+        "allocation-id",
+        lambda eip: {"public_ip": eip["PublicIp"]},
+    ),
+    "aws_nat_gateway": ec2_check(
+        "describe_nat_gateways",
+        "NatGateways",
+        "NatGatewayId",
+        "nat-gateway-id",
+        lambda nat: {
+            "subnet_id": nat["SubnetId"],
+            "allocation_id": next(
+                (a.get("AllocationId") for a in nat.get("NatGatewayAddresses", [])),
+                None,
+            ),
+        },
+        filter_param="Filter",
+        skip=lambda nat: nat["State"] in ("deleting", "deleted", "failed"),
+    ),
+    "aws_route_table": ec2_check(
+        "describe_route_tables",
+        "RouteTables",
+        "RouteTableId",
+        "route-table-id",
+        lambda rt: {"vpc_id": rt["VpcId"], "route": live_routes(rt["Routes"])},
+        state={"route": state_routes},
+    ),
+    "aws_launch_template": ec2_check(
+        "describe_launch_templates",
+        "LaunchTemplates",
+        "LaunchTemplateId",
+        None,  # No id filter: LaunchTemplateIds is used instead
+        lambda lt: {
+            "name": lt["LaunchTemplateName"],
+            "latest_version": lt["LatestVersionNumber"],
+            "default_version": lt["DefaultVersionNumber"],
+        },
+        ids_param="LaunchTemplateIds",
+        not_found="InvalidLaunchTemplateId.NotFound",
+    ),
+    "aws_lb": elbv2_check(
+        "describe_load_balancers",
+        "LoadBalancers",
+        "LoadBalancerArn",
+        lambda lb: {
+            "dns_name": lb["DNSName"],
+            "internal": lb["Scheme"] == "internal",
+            "load_balancer_type": lb["Type"],
+            "security_groups": lb.get("SecurityGroups", []),
+            "subnets": [az["SubnetId"] for az in lb["AvailabilityZones"]],
+        },
+    ),
+    "aws_lb_target_group": elbv2_check(
+        "describe_target_groups",
+        "TargetGroups",
+        "TargetGroupArn",
+        lambda tg: {
+            "port": tg.get("Port"),
+            "protocol": tg.get("Protocol"),
+            "vpc_id": tg.get("VpcId"),
+            "health_check.0.path": tg.get("HealthCheckPath"),
+            "health_check.0.matcher": tg.get("Matcher", {}).get("HttpCode"),
+        },
+    ),
+    "aws_lb_listener": {"service": "elbv2", "describe": describe_listeners},
+    "aws_db_instance": {
+        "service": "rds",
+        "describe": describe_db_instances,
+        "list_tagged": list_tagged_db_instances,
+    },
+    "aws_db_subnet_group": {"service": "rds", "describe": describe_db_subnet_groups},
+    "aws_s3_bucket": s3_check(read_bucket),
+    "aws_s3_bucket_versioning": s3_check(read_bucket_versioning),
+    "aws_s3_bucket_public_access_block": s3_check(read_public_access_block),
+    "aws_autoscaling_group": {
+        "service": "autoscaling",
+        "describe": describe_auto_scaling_groups,
+    },
+}
+
+
+def compare(check, state_attributes, live_attributes):
+    """Return the (attribute, state value, live value) that differ."""
+    changes = []
+    for path, live_value in live_attributes.items():
+        if path in check.get("state", {}):
+            state_value = check["state"][path](state_attributes)
+        else:
+            state_value = get_path(state_attributes, path)
+        if normalize(state_value) != normalize(live_value):
+            changes.append((path, state_value, live_value))
+    return changes
+
+
+def check_drift(ctx=None, state_path=STATE_FILE, max_workers=MAX_WORKERS):
+    """
+    Compare the Terraform state with the live account.
+    All the describe calls (batched per resource type) run at the same time.
+
+    Returns a dict with the missing resources, the extra ones (tagged with the
+    project but not in the state), the changed attributes, the resource types
+    that are not checked and the errors.
+    """
+    ctx = ctx or AwsContext()
+
+    # Group the state resources by type: {type: {id: (address, attributes)}}
+    by_type = {}
+    project = None
+    for address, resource_type, attributes in load_state(state_path):
+        by_type.setdefault(resource_type, {})[attributes["id"]] = (address, attributes)
+        project = project or (attributes.get("tags_all") or {}).get("Project")
+
+    report = {"missing": [], "extra": [], "changed": [], "skipped": [], "errors": []}
+    checked = {t: c for t, c in CHECKS.items() if t in by_type}
+    report["skipped"] = sorted(t for t in by_type if t not in CHECKS)
+
+    # Clients are created up front: the client cache is not thread-safe, the
+    # clients themselves are
+    clients = {c["service"]: ctx.client(c["service"]) for c in checked.values()}
+
+    found = {resource_type: {} for resource_type in checked}
+    tagged = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {}
+        for resource_type, check in checked.items():
+            client = clients[check["service"]]
+            ids = list(by_type[resource_type])
+            if "describe_all" in check:
+                future = pool.submit(check["describe_all"], client, ids, project)
+                futures[future] = (resource_type, "describe_all")
+                continue
+            batch_size = check.get("batch_size", BATCH_SIZE)
+            for i in range(0, len(ids), batch_size):
+                future = pool.submit(check["describe"], client, ids[i : i + batch_size])
+                futures[future] = (resource_type, "describe")
+            if project and "list_tagged" in check:
+                future = pool.submit(check["list_tagged"], client, project)
+                futures[future] = (resource_type, "list_tagged")
+
+        for future in as_completed(futures):
+            resource_type, call = futures[future]
+            try:
+                result = future.result()
+            except (ClientError, BotoCoreError) as e:
+                # One error per type, even if several of its calls failed
+                if resource_type not in dict(report["errors"]):
+                    report["errors"].append((resource_type, str(e)))
+                continue
+            if call == "describe_all":
+                found[resource_type].update(result[0])
+                tagged.setdefault(resource_type, set()).update(result[1])
+            elif call == "describe":
+                found[resource_type].update(result)
+            else:
+                tagged.setdefault(resource_type, set()).update(result)
+
+    failed = {resource_type for resource_type, _ in report["errors"]}
+    for resource_type, check in checked.items():
+        if resource_type in failed:
+            continue
+        for resource_id, (address, attributes) in by_type[resource_type].items():
+            if resource_id not in found[resource_type]:
+                report["missing"].append(address)
+                continue
+            for change in compare(check, attributes, found[resource_type][resource_id]):
+                report["changed"].append((address, *change))
+        for resource_id in sorted(
+            tagged.get(resource_type, set()) - set(by_type[resource_type])
+        ):
+            report["extra"].append((resource_type, resource_id))
+
+    return report
+
+
+def run_drift_check(ctx=None, state_path=STATE_FILE):
+    """
+    Print the drift report. Returns the exit code: 0 if the account matches the
+    state, 1 if a drift was detected, 2 if some types could not be checked.
+    """
+    print("============================================================")
+    print("      DRIFT CHECK TERRAFORM STATE <-> AWS (WEBMARKET+)      ")
+    print("============================================================")
+
+    report = check_drift(ctx, state_path)
+
+    for address in report["missing"]:
+        print(f"   ❌ MISSING : {address} (in the state, not in AWS)")
+    for resource_type, resource_id in report["extra"]:
+        print(
+            f"   ➕ EXTRA   : {resource_type} {resource_id} (in AWS, not in the state)"
+        )
+    for address, path, state_value, live_value in report["changed"]:
+        print(f"   ✏️  CHANGED : {address}.{path}: {state_value} -> {live_value}")
+    for resource_type, error in report["errors"]:
+        print(f"   ⚠️  Error checking {resource_type}: {error}")
+    if report["skipped"]:
+        print(f"   ℹ️  Not checked: {', '.join(report['skipped'])}")
+
+    drift = report["missing"] or report["extra"] or report["changed"]
+    print("=" * 60)
+    if drift:
+        print(
+            f"   ⚠️  Drift detected: {len(report['missing'])} missing, "
+            f"{len(report['extra'])} extra, {len(report['changed'])} changed."
+        )
+    if report["errors"]:
+        print(
+            f"   ⚠️  Check incomplete: {len(report['errors'])} type(s) could not "
+            "be checked."
+        )
+    elif not drift:
+        print("   ✅ No drift detected. The account matches the state.")
+    print("============================================================")
+
+    # A broken check must never look like a clean pass
+    if report["errors"]:
+        return 2
+    return 1 if drift else 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_drift_check())
@@ -1,83 +1,287 @@
+import http.client
+import queue
+import random
+import socket
 import time
 import threading
-import requests
-import subprocess
-import json
 import sys
-import os
+from urllib.parse import urlsplit
+
+from aws_context import AwsContext
 
 
 # Configuration
-TERRAFORM_DIR = os.path.join(os.path.dirname(__file__), "../terraform")
+NUM_THREADS = 100  # 20 threads are usually enough to load a t3.micro
+NEW_CONNECTION_PERCENT = 50  # Share of new connections in 'mixed' mode
+TIMEOUT = 10  # Seconds
+CHUNK_SIZE = 64 * 1024  # Bytes read at a time when draining a response
+REPORT_INTERVAL = 10  # Seconds between two statistics reports
 
 
-def get_alb_url():
+def get_alb_url(ctx=None):
     """Retrieve the Load Balancer URL from Terraform outputs."""
+    ctx = ctx or AwsContext()
+    dns_name = ctx.terraform_output("alb_dns_name")
+    if not dns_name:
+        print("❌ Error: Terraform output 'alb_dns_name' not found.")
+        sys.exit(1)
+    return f"http://{dns_name}"
+
+
+def open_connection(host, port):
+    """
+    Open a new HTTP connection, timing the DNS resolution and the TCP connect
+    separately. Returns (connection, dns seconds, connect seconds).
+    """
+    start = time.perf_counter()
+    addresses = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    resolved = time.perf_counter()
+
+    # Like a browser, pick one of the ALB nodes returned by the DNS
+    family, sock_type, proto, _, address = random.choice(addresses)
+    sock = socket.socket(family, sock_type, proto)
+    sock.settimeout(TIMEOUT)
     try:
-        cmd = ["terraform", "output", "-json"]
-        result = subprocess.run(
-            cmd, cwd=TERRAFORM_DIR, capture_output=True, text=True, check=True
+        sock.connect(address)
+    except OSError:
+        sock.close()
+        raise
+    connected = time.perf_counter()
+
+    connection = http.client.HTTPConnection(host, port, timeout=TIMEOUT)
+    connection.sock = sock  # Already connected: http.client will not reconnect
+    return connection, resolved - start, connected - resolved
+
+
+class NoResponseError(ConnectionError):
+    """The connection was closed before any byte of the response arrived."""
+
+
+class ConnectionPool:
+    """
+    Keep-alive connections shared by all the threads. At most 'size' connections
+    are open: threads wait for a free one, like a browser or a proxy would.
+    """
+
+    def __init__(self, size):
+        self._slots = queue.LifoQueue()
+        for _ in range(size):
+            self._slots.put(None)  # Free slot, connection not opened yet
+
+    def get(self):
+        """Wait for a free slot: a connection, or None if one must be opened."""
+        return self._slots.get()
+
+    def put(self, connection):
+        """Give back a reusable connection, or None if it was closed."""
+        self._slots.put(connection)
+
+
+class TrafficStats:
+    """Thread-safe timings of the requests since the last report."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.total_requests = 0
+        self._reset()
+
+    def _reset(self):
+        self.requests = 0
+        self.new_connections = 0
+        self.errors = 0
+        self.bytes = 0
+        self.statuses = {}
+        self.timings = {"dns": [], "connect": [], "ttfb": [], "total": []}
+        self.interval_start = time.perf_counter()
+
+    def record(self, status, size, ttfb, total, dns=None, connect=None):
+        with self._lock:
+            self.requests += 1
+            self.total_requests += 1
+            self.bytes += size
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+            self.timings["ttfb"].append(ttfb)
+            self.timings["total"].append(total)
+            if dns is not None:
+                self.new_connections += 1
+                self.timings["dns"].append(dns)
+                self.timings["connect"].append(connect)
+
+    def record_error(self):
+        with self._lock:
+            self.errors += 1
+
+    def report(self):
+        """Print the statistics of the last interval and start a new one."""
+        with self._lock:
+            elapsed = time.perf_counter() - self.interval_start
+            requests, new_connections, errors = (
+                self.requests,
+                self.new_connections,
+                self.errors,
+            )
+            size, statuses, timings = self.bytes, self.statuses, self.timings
+            self._reset()
+
+        print(
+            f"📊 {requests / elapsed:7.1f} req/s | "
+            f"{new_connections / elapsed:7.1f} new conn/s | "
+            f"{size / elapsed / 1e6:6.2f} MB/s | errors: {errors} | "
+            f"status: {dict(sorted(statuses.items()))}"
         )
-        outputs = json.loads(result.stdout)
-        dns_name = outputs.get("alb_dns_name", {}).get("value")
-        if not dns_name:
-            print("❌ Error: Terraform output 'alb_dns_name' not found.")
-            sys.exit(1)
-        return f"http://{dns_name}"
-    except Exception as e:
-        print(f"❌ Terraform error: {e}")
-        sys.exit(1)
+        for phase in ("dns", "connect", "ttfb", "total"):
+            values = sorted(timings[phase])
+            if not values:
+                continue
+            p50 = values[len(values) // 2]
+            p95 = values[min(int(len(values) * 0.95), len(values) - 1)]
+            print(
+                f"   {phase:<8} avg {1000 * sum(values) / len(values):7.1f} ms | "
+                f"p50 {1000 * p50:7.1f} ms | p95 {1000 * p95:7.1f} ms"
+            )
+
+
+def send_request(connection, path, buffer, keep_alive):
+    """
+    Send one GET and drain the response without decoding it.
+    Returns (response, body size, time to first byte, total time).
+    """
+    headers = {
+        "Accept-Encoding": "identity",  # No compression: nothing to decode
+        "Connection": "keep-alive" if keep_alive else "close",
+    }
+    start = time.perf_counter()
+    try:
+        connection.request("GET", path, headers=headers)
+        response = connection.getresponse()  # Returns once the status line is received
+    except ConnectionError as e:
+        raise NoResponseError(e) from e
+    first_byte = time.perf_counter()
+
+    size = 0
+    while True:
+        read = response.readinto(buffer)
+        if not read:
+            break
+        size += read
+    return response, size, first_byte - start, time.perf_counter() - start
 
 
-def send_traffic(url, thread_id):
-    """Continuously send HTTP requests to the target URL."""
-    count = 0
-    session = requests.Session()  # Connection reuse optimization
+def send_traffic(url, thread_id, pool, stats, new_connection_percent):
+    """
+    Continuously send HTTP requests to the target URL.
+    'new_connection_percent' of the requests use a new connection (closed after
+    the response), the others reuse a keep-alive connection from the pool.
+    """
+    target = urlsplit(url)
+    host, port = target.hostname, target.port or 80
+    path = target.path or "/"
+    buffer = bytearray(CHUNK_SIZE)  # Reused for every response body
     print(f"🚀 [Thread-{thread_id}] Starting traffic load...")
 
     while True:
+        pooled = random.random() * 100 >= new_connection_percent
+        connection = pool.get() if pooled else None
+        dns = connect = None
         try:
-            resp = session.get(url)
-            count += 1
-
-            # Log every 50 calls to avoid spamming the terminal
-            if count % 50 == 0:
-                print(
-                    f"   [Thread-{thread_id}] {count} requests sent (Status: {resp.status_code})"
+            if connection is None:
+                connection, dns, connect = open_connection(host, port)
+            try:
+                response, size, ttfb, total = send_request(
+                    connection, path, buffer, pooled
                 )
+            except NoResponseError:
+                if dns is not None:
+                    raise
+                # The server closed the idle keep-alive connection: retry once on a
+                # new connection (counted as such, not as an error)
+                connection.close()
+                connection, dns, connect = open_connection(host, port)
+                response, size, ttfb, total = send_request(
+                    connection, path, buffer, pooled
+                )
+            stats.record(response.status, size, ttfb, total, dns, connect)
+
+            if not pooled or response.will_close:
+                connection.close()
+                connection = None
 
-        except Exception as e:
+        except (OSError, http.client.HTTPException) as e:
+            stats.record_error()
             print(f"⚠️ Error: {e}")
+            if connection is not None:
+                connection.close()
+                connection = None
             time.sleep(1)
 
+        finally:
+            if pooled:
+                pool.put(connection)
 
-if __name__ == "__main__":
+
+def run_load(
+    num_threads=NUM_THREADS,
+    ctx=None,
+    mode="pooled",
+    pool_size=None,
+    new_connection_percent=NEW_CONNECTION_PERCENT,
+):
+    """
+    Start the virtual clients and keep them running until CTRL+C.
+
+    Args:
+        num_threads: Number of virtual clients
+        ctx: Shared AwsContext (a new one is created if not provided)
+        mode: 'pooled' (keep-alive connections from a pool), 'new' (a new
+              connection per request) or 'mixed'
+        pool_size: Keep-alive connections in the pool (default: one per thread)
+        new_connection_percent: Share of new connections in 'mixed' mode
+    """
     print("============================================================")
     print("      LOAD GENERATOR 'WINTER SALES' (STRESS TEST)           ")
     print("============================================================")
 
-    target_url = get_alb_url()
+    target_url = get_alb_url(ctx)
+    pool = ConnectionPool(pool_size or num_threads)
+    stats = TrafficStats()
+    new_connection_percent = {"pooled": 0, "new": 100}.get(mode, new_connection_percent)
+
     print(f"🎯 Target locked: {target_url}")
+    print(
+        f"🔌 Connection mode: {mode} (pool size: {pool_size or num_threads}, "
+        f"new connections: {new_connection_percent}%)"
+    )
     print("⚠️  WARNING: This script will generate real traffic.")
     print("    Press CTRL+C to stop.")
     print("============================================================")
     time.sleep(2)
 
     # Start worker threads (virtual clients)
-    # 20 threads are usually enough to load a t3.micro
-    NUM_THREADS = 100
     threads = []
 
     try:
-        for i in range(NUM_THREADS):
-            t = threading.Thread(target=send_traffic, args=(target_url, i + 1))
+        for i in range(num_threads):
+            t = threading.Thread(
+                target=send_traffic,
+                args=(target_url, i + 1, pool, stats, new_connection_percent),
+            )
             t.daemon = True  # Ensure threads exit when the main program stops
             t.start()
             threads.append(t)
 
         while True:
-            time.sleep(1)
+            time.sleep(REPORT_INTERVAL)
+            stats.report()
 
     except KeyboardInterrupt:
         print("\n\n🛑 Stopping traffic. End of the simulation.")
+        print(
+            f"   {stats.total_requests} requests sent in "
+            f"{time.perf_counter() - stats.started:.0f} s."
+        )
         print("   Check CloudWatch to observe the drop in load!")
+
+
+if __name__ == "__main__":
+    run_load()
@@ -0,0 +1,412 @@
+from botocore.exceptions import BotoCoreError, ClientError
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone, timedelta
+import sys
+
+from audit_infra import PRICING
+from aws_context import AwsContext
+
+
+MAX_WORKERS = 8  # Deletions running at the same time (EC2 throttles mutating calls)
+BATCH_SIZE = 50  # Deletions per worker task
+KEEP_VERSIONS = 5  # Most recent launch-template versions always kept for rollback
+MAX_VERSIONS_PER_CALL = 200  # DeleteLaunchTemplateVersions limit
+MAX_FILTER_VALUES = 200  # Values per filter in a describe call
+UNATTACHED_TAG = "UnattachedSince"  # Set on volumes when first seen unattached
+MANAGED_SNAPSHOT_TAGS = {
+    "aws:backup:source-resource",  # AWS Backup
+    "aws:dlm:lifecycle-policy-id",  # Data Lifecycle Manager
+}
+
+
+def paginate(client, method, key, **kwargs):
+    """Stream the items of a paginated describe call, one page at a time."""
+    for page in client.get_paginator(method).paginate(**kwargs):
+        yield from page[key]
+
+
+def build_indexes(ctx):
+    """
+    Load what is still in use, in parallel, into in-memory indexes:
+        images: snapshot ids used by our AMIs
+        template_versions: {launch template id: versions used by ASGs/instances}
+    ($Latest/$Default references are covered: those versions are always kept)
+    """
+    ec2 = ctx.client("ec2")
+    autoscaling = ctx.client("autoscaling")
+
+    def index_images():
+        return {
+            mapping["Ebs"]["SnapshotId"]
+            for image in paginate(ec2, "describe_images", "Images", Owners=["self"])
+            for mapping in image.get("BlockDeviceMappings", [])
+            if "SnapshotId" in mapping.get("Ebs", {})
+        }
+
+    def index_asg_templates():
+        specs = []
+        for group in paginate(
+            autoscaling, "describe_auto_scaling_groups", "AutoScalingGroups"
+        ):
+            spec = group.get("LaunchTemplate") or group.get(
+                "MixedInstancesPolicy", {}
+            ).get("LaunchTemplate", {}).get("LaunchTemplateSpecification")
+            if spec:
+                specs.append(
+                    (spec["LaunchTemplateId"], spec.get("Version", "$Default"))
+                )
+        return specs
+
+    def index_instance_templates():
+        # EC2 tags every instance launched from a template with its id and version
+        specs = []
+        reservations = paginate(
+            ec2,
+            "describe_instances",
+            "Reservations",
+            Filters=[
+                {
+                    "Name": "instance-state-name",
+                    "Values": ["pending", "running", "stopping", "stopped"],
+                }
+            ],
+        )
+        for reservation in reservations:
+            for instance in reservation["Instances"]:
+                tags = {t["Key"]: t["Value"] for t in instance.get("Tags", [])}
+                if "aws:ec2launchtemplate:id" in tags:
+                    specs.append(
+                        (
+                            tags["aws:ec2launchtemplate:id"],
+                            tags.get("aws:ec2launchtemplate:version", "$Default"),
+                        )
+                    )
+        return specs
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        images = pool.submit(index_images)
+        asg_specs = pool.submit(index_asg_templates)
+        instance_specs = pool.submit(index_instance_templates)
+
+        template_versions = {}
+        for template_id, version in asg_specs.result() + instance_specs.result():
+            if not version.startswith("$"):
+                template_versions.setdefault(template_id, set()).add(int(version))
+
+        return {"images": images.result(), "template_versions": template_versions}
+
+
+def get_project_scope(ctx):
+    """
+    Get the project name and the launch template id from the Terraform outputs:
+    the sweeper never touches resources outside of this project.
+    """
+    project = ctx.terraform_output("project_name")
+    template_id = ctx.terraform_output("launch_template_id")
+    if not project or not template_id:
+        print("❌ Error: 'project_name' / 'launch_template_id' outputs not found.")
+        print("Run 'terraform apply' to create them.")
+        sys.exit(1)
+    return project, template_id
+
+
+def find_orphans(ctx=None, days=7):
+    """
+    Stream this project's EBS volumes, EBS snapshots and launch-template versions
+    and return the ones no longer linked to anything, with their estimated
+    monthly cost.
+
+    Volumes have no detach date in the API: the first run that sees a volume
+    unattached tags it (UNATTACHED_TAG), and it only becomes an orphan once it
+    has stayed unattached for 'days'. Snapshots do not inherit the volume tags:
+    each run tags with 'Project' the snapshots of the project's volumes, so that
+    they are still found once their volume is deleted.
+
+    Args:
+        ctx: Shared AwsContext (a new one is created if not provided)
+        days: Minimum age in days before a resource is considered orphaned
+
+    Returns:
+        (orphans, tag updates as (method, resource ids, tags, description))
+    """
+    ctx = ctx or AwsContext()
+    ec2 = ctx.client("ec2")
+    project, template_id = get_project_scope(ctx)
+    project_filter = [{"Name": "tag:Project", "Values": [project]}]
+    now = datetime.now(timezone.utc)
+    limit_date = now - timedelta(days=days)
+    indexes = build_indexes(ctx)
+    orphans, to_tag, to_untag, snapshots_to_tag = [], [], [], []
+
+    # Volumes of the project (tagged by the launch template) and the index of
+    # them, for the snapshots
+    volume_ids = set()
+    for volume in paginate(ec2, "describe_volumes", "Volumes", Filters=project_filter):
+        volume_ids.add(volume["VolumeId"])
+        tags = {t["Key"]: t["Value"] for t in volume.get("Tags", [])}
+        if volume["State"] != "available":
+            if UNATTACHED_TAG in tags:
+                to_untag.append(volume["VolumeId"])
+            continue
+        try:
+            unattached_since = datetime.fromisoformat(tags[UNATTACHED_TAG])
+        except (KeyError, ValueError):
+            # Not tagged yet (or a malformed tag): the count starts now
+            to_tag.append(volume["VolumeId"])
+            continue
+        if unattached_since.tzinfo is None:
+            unattached_since = unattached_since.replace(tzinfo=timezone.utc)
+        if unattached_since >= limit_date:
+            continue
+        price = PRICING.get(f"ebs_{volume['VolumeType']}_gb_month", 0.0)
+        orphans.append(
+            {
+                "kind": "volume",
+                "id": volume["VolumeId"],
+                "detail": f"{volume['Size']} GiB {volume['VolumeType']}, "
+                f"unattached for {(now - unattached_since).days} days",
+                "monthly_cost": volume["Size"] * price,
+            }
+        )
+
+    # Snapshots of the project's volumes, to tag while the volume still exists
+    volume_list = sorted(volume_ids)
+    for i in range(0, len(volume_list), MAX_FILTER_VALUES):
+        snapshots = paginate(
+            ec2,
+            "describe_snapshots",
+            "Snapshots",
+            OwnerIds=["self"],
+            Filters=[
+                {
+                    "Name": "volume-id",
+                    "Values": volume_list[i : i + MAX_FILTER_VALUES],
+                }
+            ],
+        )
+        for snapshot in snapshots:
+            tags = {t["Key"]: t["Value"] for t in snapshot.get("Tags", [])}
+            if tags.get("Project") != project:
+                snapshots_to_tag.append(snapshot["SnapshotId"])
+
+    # Old snapshots of the project whose volume is gone and that no AMI uses.
+    # Snapshots managed by AWS Backup or DLM follow their own retention, and
+    # copied snapshots have no source volume (vol-ffffffff)
+    snapshots = paginate(
+        ec2,
+        "describe_snapshots",
+        "Snapshots",
+        OwnerIds=["self"],
+        Filters=project_filter,
+    )
+    for snapshot in snapshots:
+        tags = {t["Key"] for t in snapshot.get("Tags", [])}
+        if (
+            snapshot["StartTime"] >= limit_date
+            or snapshot["VolumeId"] in volume_ids
+            or snapshot["VolumeId"] == "vol-ffffffff"
+            or snapshot["SnapshotId"] in indexes["images"]
+            or tags & MANAGED_SNAPSHOT_TAGS
+        ):
+            continue
+        age_days = (now - snapshot["StartTime"]).days
+        orphans.append(
+            {
+                "kind": "snapshot",
+                "id": snapshot["SnapshotId"],
+                "detail": f"{snapshot['VolumeSize']} GiB, {age_days} days, volume deleted",
+                # Upper bound: snapshots are incremental
+                "monthly_cost": snapshot["VolumeSize"]
+                * PRICING["ebs_snapshot_gb_month"],
+            }
+        )
+
+    # Versions of the project's launch template: not default, not latest, not
+    # used and not recent
+    templates = paginate(
+        ec2,
+        "describe_launch_templates",
+        "LaunchTemplates",
+        LaunchTemplateIds=[template_id],
+    )
+    for template in templates:
+        in_use = set(indexes["template_versions"].get(template_id, set()))
+        in_use.add(template["DefaultVersionNumber"])
+        in_use.update(
+            range(
+                template["LatestVersionNumber"] - KEEP_VERSIONS + 1,
+                template["LatestVersionNumber"] + 1,
+            )
+        )
+
+        versions = paginate(
+            ec2,
+            "describe_launch_template_versions",
+            "LaunchTemplateVersions",
+            LaunchTemplateId=template_id,
+        )
+        for version in versions:
+            number = version["VersionNumber"]
+            if number in in_use or version["CreateTime"] >= limit_date:
+                continue
+            orphans.append(
+                {
+                    "kind": "launch-template-version",
+                    "id": f"{template_id}:{number}",
+                    "detail": f"{template['LaunchTemplateName']} version {number}",
+                    "monthly_cost": 0.0,
+                }
+            )
+
+    tag_updates = [
+        (
+            "create_tags",
+            to_tag,
+            [{"Key": UNATTACHED_TAG, "Value": now.isoformat(timespec="seconds")}],
+            f"newly unattached volume(s) ({UNATTACHED_TAG})",
+        ),
+        (
+            "delete_tags",
+            to_untag,
+            [{"Key": UNATTACHED_TAG}],
+            f"re-attached volume(s) (remove {UNATTACHED_TAG})",
+        ),
+        (
+            "create_tags",
+            snapshots_to_tag,
+            [{"Key": "Project", "Value": project}],
+            "snapshot(s) of project volumes (Project)",
+        ),
+    ]
+    return orphans, tag_updates
+
+
+def update_tags(ctx, tag_updates, dry_run=False):
+    """Apply the tag updates found by find_orphans, in batches."""
+    ec2 = ctx.client("ec2")
+    for method, resource_ids, tags, description in tag_updates:
+        if not resource_ids:
+            continue
+        if dry_run:
+            print(f"ℹ️  Tags not updated (dry run): {len(resource_ids)} {description}")
+            continue
+        print(f"🏷️  Updating tags: {len(resource_ids)} {description}")
+        for i in range(0, len(resource_ids), BATCH_SIZE):
+            getattr(ec2, method)(Resources=resource_ids[i : i + BATCH_SIZE], Tags=tags)
+
+
+def delete_batch(ec2, kind, ids):
+    """Delete one batch of orphans. Returns (deleted ids, [(id, error)])."""
+    deleted, errors = [], []
+
+    if kind == "launch-template-version":
+        template_id = ids[0].split(":")[0]
+        response = ec2.delete_launch_template_versions(
+            LaunchTemplateId=template_id, Versions=[i.split(":")[1] for i in ids]
+        )
+        for item in response.get("SuccessfullyDeletedLaunchTemplateVersions", []):
+            deleted.append(f"{template_id}:{item['VersionNumber']}")
+        for item in response.get("UnsuccessfullyDeletedLaunchTemplateVersions", []):
+            errors.append(
+                (
+                    f"{template_id}:{item['VersionNumber']}",
+                    item["ResponseError"]["Message"],
+                )
+            )
+        return deleted, errors
+
+    for resource_id in ids:
+        try:
+            if kind == "volume":
+                ec2.delete_volume(VolumeId=resource_id)
+            else:
+                ec2.delete_snapshot(SnapshotId=resource_id)
+            deleted.append(resource_id)
+        except ClientError as e:
+            errors.append((resource_id, e.response.get("Error", {}).get("Message")))
+    return deleted, errors
+
+
+def delete_orphans(ctx, orphans, max_workers=MAX_WORKERS):
+    """Delete the orphans in batches, several batches at the same time."""
+    ec2 = ctx.client("ec2")
+
+    # Volumes/snapshots: BATCH_SIZE per task, versions: one call per template
+    batches = []
+    for kind in ("volume", "snapshot"):
+        ids = [o["id"] for o in orphans if o["kind"] == kind]
+        batches += [
+            (kind, ids[i : i + BATCH_SIZE]) for i in range(0, len(ids), BATCH_SIZE)
+        ]
+    versions = {}
+    for orphan in orphans:
+        if orphan["kind"] == "launch-template-version":
+            versions.setdefault(orphan["id"].split(":")[0], []).append(orphan["id"])
+    for ids in versions.values():
+        batches += [
+            ("launch-template-version", ids[i : i + MAX_VERSIONS_PER_CALL])
+            for i in range(0, len(ids), MAX_VERSIONS_PER_CALL)
+        ]
+
+    deleted, errors = [], []
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            pool.submit(delete_batch, ec2, kind, ids): ids for kind, ids in batches
+        }
+        for future in as_completed(futures):
+            try:
+                batch_deleted, batch_errors = future.result()
+            except (ClientError, BotoCoreError) as e:
+                batch_deleted, batch_errors = [], [(i, str(e)) for i in futures[future]]
+            deleted += batch_deleted
+            errors += batch_errors
+    return deleted, errors
+
+
+def sweep_orphans(ctx=None, days=7, dry_run=False):
+    """
+    Find and delete the orphaned EBS volumes, EBS snapshots and launch-template
+    versions.
+
+    Args:
+        ctx: Shared AwsContext (a new one is created if not provided)
+        days: Minimum age in days before a resource is considered orphaned
+        dry_run: Only list the orphans and their cost, delete nothing
+    """
+    ctx = ctx or AwsContext()
+
+    print(f"🔍 Searching for orphaned resources older than {days} days...")
+    try:
+        orphans, tag_updates = find_orphans(ctx, days)
+        update_tags(ctx, tag_updates, dry_run)
+    except ClientError as e:
+        print(f"❌ AWS Error: {e}")
+        return
+
+    if not orphans:
+        print("✅ No orphaned resources found.")
+        return
+
+    print("\n🧹 Orphaned resources:")
+    for orphan in orphans:
+        print(
+            f"   🗑️  {orphan['kind']:<24} | {orphan['id']:<28} | {orphan['detail']:<40} "
+            f"| {orphan['monthly_cost']:.2f}$/month"
+        )
+
+    total = sum(orphan["monthly_cost"] for orphan in orphans)
+    print(f"\n💰 {len(orphans)} orphan(s), estimated waste: {total:.2f} $ / month")
+
+    if dry_run:
+        print("ℹ️  Dry run: nothing deleted.")
+        return
+
+    print("\n🗑️  Starting cleanup...")
+    deleted, errors = delete_orphans(ctx, orphans)
+    for resource_id, error in errors:
+        print(f"   ⚠️  Error deleting {resource_id}: {error}")
+    print(f"\n✅ Cleanup completed. {len(deleted)} resource(s) deleted.")
+
+
+if __name__ == "__main__":
+    sweep_orphans(dry_run="--dry-run" in sys.argv[1:])
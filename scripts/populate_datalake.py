@@ -1,40 +1,18 @@
-import boto3
-import json
-import subprocess
 import os
 import sys
 
+from aws_context import AwsContext
+
 
 LOCAL_DATA_DIR = os.path.join(
     os.path.dirname(__file__), "../assets"
 )  # Folder containing the assets to upload to the datalake
-TERRAFORM_DIR = os.path.join(
-    os.path.dirname(__file__), "../terraform"
-)  # Folder containing the Terraform files
-
-
-def get_terraform_outputs():
-    """Get the outputs of Terraform in JSON format."""
-    print(f"🔍 Lecture de la configuration Terraform depuis {TERRAFORM_DIR}...")
-    try:
-        # Run 'terraform output -json' to get the real values
-        cmd = ["terraform", "output", "-json"]
-        result = subprocess.run(
-            cmd, cwd=TERRAFORM_DIR, capture_output=True, text=True, check=True
-        )
-        return json.loads(result.stdout)
-    except subprocess.CalledProcessError:
-        print("❌ Erreur : Impossible de lire les outputs Terraform.")
-        print("Assure-toi d'avoir fait 'terraform apply' avant.")
-        sys.exit(1)
-    except FileNotFoundError:
-        print("❌ Erreur : La commande 'terraform' n'est pas trouvée.")
-        sys.exit(1)
 
 
-def upload_to_s3(bucket_name):
+def upload_to_s3(bucket_name, ctx=None):
     """Browse the local folder and upload everything to S3."""
-    s3 = boto3.client("s3")
+    ctx = ctx or AwsContext()
+    s3 = ctx.client("s3")
 
     # Check if the local folder exists
     if not os.path.exists(LOCAL_DATA_DIR):
@@ -67,16 +45,20 @@ def upload_to_s3(bucket_name):
     print("\n✅ Population du Data Lake terminée avec succès !")
 
 
-if __name__ == "__main__":
-    # Get the name of the bucket created by Terraform
-    outputs = get_terraform_outputs()
+def populate(ctx=None):
+    """Upload the local assets to the bucket created by Terraform."""
+    ctx = ctx or AwsContext()
 
     # The name of the output must correspond to the outputs.tf file ('s3_bucket_name')
-    bucket_name = outputs.get("s3_bucket_name", {}).get("value")
+    bucket_name = ctx.terraform_output("s3_bucket_name")
 
     if not bucket_name:
         print("❌ Erreur : Output 's3_bucket_name' introuvable dans Terraform.")
         sys.exit(1)
 
     # Run the upload
-    upload_to_s3(bucket_name)
+    upload_to_s3(bucket_name, ctx)
+
+
+if __name__ == "__main__":
+    populate()
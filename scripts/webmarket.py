@@ -0,0 +1,215 @@
+import argparse
+import sys
+
+from aws_context import AwsContext, DEFAULT_REGION
+
+
+# Separator used to chain several commands in one run:
+#   python scripts/webmarket.py backup + cleanup --days 7 + audit
+COMMAND_SEPARATOR = "+"
+
+
+# Each command imports its script only when it runs, so boto3/botocore/numpy
+# are not loaded for '--help' or for commands that do not need them.
+def cmd_audit(args, ctx):
+    from audit_infra import run_audit
+
+    run_audit(ctx)
+
+
+def cmd_cost(args, ctx):
+    from cost_engine import run_cost_report
+
+    run_cost_report(ctx, args.days, args.period)
+
+
+def cmd_drift(args, ctx):
+    from drift_check import run_drift_check, STATE_FILE
+
+    # Exit code 1 when a drift is detected, 2 when the check is incomplete
+    # (for cron/alerting)
+    return run_drift_check(ctx, args.state or STATE_FILE)
+
+
+def cmd_backup(args, ctx):
+    from backup_manager import create_rds_snapshot
+
+    create_rds_snapshot(ctx)
+
+
+def cmd_cleanup(args, ctx):
+    from cleanup import cleanup_old_snapshots
+
+    cleanup_old_snapshots(args.days, ctx)
+
+
+def cmd_sweep(args, ctx):
+    from orphan_sweeper import sweep_orphans
+
+    sweep_orphans(ctx, args.days, args.dry_run)
+
+
+def cmd_schedule(args, ctx):
+    from daily_scheduler import manage_instances
+
+    manage_instances(args.action, ctx)
+
+
+def cmd_populate(args, ctx):
+    from populate_datalake import populate
+
+    populate(ctx)
+
+
+def cmd_load(args, ctx):
+    from load_generator import run_load
+
+    run_load(args.threads, ctx, args.mode, args.pool_size, args.new_percent)
+
+
+def build_parser():
+    """Build the argument parser of the 'webmarket' CLI."""
+    parser = argparse.ArgumentParser(
+        prog="webmarket",
+        description="WebMarket+ infrastructure tools.",
+        epilog=(
+            f"Several commands can be chained with '{COMMAND_SEPARATOR}' and share "
+            "one AWS session and Terraform read, e.g. "
+            f"'webmarket backup {COMMAND_SEPARATOR} cleanup --days 7'. "
+            "Global options are taken from the first command."
+        ),
+    )
+    parser.add_argument(
+        "--region",
+        default=DEFAULT_REGION,
+        help=f"AWS region (default: {DEFAULT_REGION})",
+    )
+    parser.add_argument("--profile", default=None, help="AWS profile to use")
+
+    subparsers = parser.add_subparsers(dest="command", metavar="command")
+    subparsers.required = True
+
+    audit = subparsers.add_parser("audit", help="FinOps & security audit")
+    audit.set_defaults(func=cmd_audit)
+
+    cost = subparsers.add_parser(
+        "cost", help="Month-to-date & projected costs from usage"
+    )
+    cost.add_argument(
+        "--days",
+        type=int,
+        default=None,
+        help="Also report the cost over the last N days and its monthly average",
+    )
+    cost.add_argument(
+        "--period",
+        type=int,
+        default=None,
+        help="Metric period in seconds (default: finest available)",
+    )
+    cost.set_defaults(func=cmd_cost)
+
+    drift = subparsers.add_parser(
+        "drift", help="Compare the Terraform state with the live account"
+    )
+    drift.add_argument(
+        "--state",
+        default=None,
+        help="Terraform state file (default: terraform/terraform.tfstate)",
+    )
+    drift.set_defaults(func=cmd_drift)
+
+    backup = subparsers.add_parser("backup", help="Create a manual RDS snapshot")
+    backup.set_defaults(func=cmd_backup)
+
+    cleanup = subparsers.add_parser("cleanup", help="Delete old RDS snapshots")
+    cleanup.add_argument(
+        "--days", type=int, default=7, help="Retention period in days (default: 7)"
+    )
+    cleanup.set_defaults(func=cmd_cleanup)
+
+    sweep = subparsers.add_parser(
+        "sweep", help="Delete orphaned EBS volumes, snapshots & template versions"
+    )
+    sweep.add_argument(
+        "--days", type=int, default=7, help="Minimum age in days (default: 7)"
+    )
+    sweep.add_argument(
+        "--dry-run", action="store_true", help="List the orphans, delete nothing"
+    )
+    sweep.set_defaults(func=cmd_sweep)
+
+    schedule = subparsers.add_parser("schedule", help="Start or stop dev instances")
+    schedule.add_argument("action", choices=["start", "stop"])
+    schedule.set_defaults(func=cmd_schedule)
+
+    populate = subparsers.add_parser("populate", help="Upload assets to the datalake")
+    populate.set_defaults(func=cmd_populate)
+
+    load = subparsers.add_parser("load", help="Generate HTTP traffic on the ALB")
+    load.add_argument(
+        "--threads",
+        type=int,
+        default=100,
+        help="Number of virtual clients (default: 100)",
+    )
+    load.add_argument(
+        "--mode",
+        choices=["pooled", "new", "mixed"],
+        default="pooled",
+        help="pooled: keep-alive pool, new: new connection per request, "
+        "mixed: --new-percent of new connections (default: pooled)",
+    )
+    load.add_argument(
+        "--pool-size",
+        type=int,
+        default=None,
+        help="Keep-alive connections in the pool (default: one per thread)",
+    )
+    load.add_argument(
+        "--new-percent",
+        type=int,
+        default=50,
+        help="Share of new connections in mixed mode (default: 50)",
+    )
+    load.set_defaults(func=cmd_load)
+
+    return parser
+
+
+def split_commands(argv):
+    """Split the command line into one argument list per chained command."""
+    commands = [[]]
+    for arg in argv:
+        if arg == COMMAND_SEPARATOR:
+            commands.append([])
+        else:
+            commands[-1].append(arg)
+    return [command for command in commands if command]
+
+
+def main(argv=None):
+    parser = build_parser()
+    argv = sys.argv[1:] if argv is None else argv
+
+    # Parse everything first so that a typo in the last command fails before
+    # the first one has touched the account.
+    parsed = [parser.parse_args(command) for command in split_commands(argv) or [[]]]
+    for args in parsed:
+        if args.command == "load":
+            if not 0 <= args.new_percent <= 100:
+                parser.error("load: --new-percent must be between 0 and 100")
+            if args.threads < 1:
+                parser.error("load: --threads must be at least 1")
+            if args.pool_size is not None and args.pool_size < 1:
+                parser.error("load: --pool-size must be at least 1")
+
+    ctx = AwsContext(region_name=parsed[0].region, profile_name=parsed[0].profile)
+    exit_code = 0
+    for args in parsed:
+        exit_code = max(exit_code, args.func(args, ctx) or 0)
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
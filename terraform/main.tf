@@ -38,6 +38,17 @@ resource "aws_launch_template" "app" {
       Environment = var.environment
     }
   }
+
+  # Tag the EBS volumes too, so scripts/orphan_sweeper.py can find the ones
+  # left behind by the ASG churn
+  tag_specifications {
+    resource_type = "volume"
+    tags = {
+      Name        = "${var.project_name}-app-volume"
+      Project     = var.project_name
+      Environment = var.environment
+    }
+  }
 }
 
 # Auto Scaling Group
@@ -51,6 +62,10 @@ resource "aws_autoscaling_group" "app" {
   health_check_type         = "ELB"
   health_check_grace_period = 300
 
+  # Group metrics used by the dashboard and the cost engine (scripts/cost_engine.py)
+  metrics_granularity = "1Minute"
+  enabled_metrics     = ["GroupInServiceInstances"]
+
   launch_template {
     id      = aws_launch_template.app.id
     version = "$Latest"
@@ -17,3 +17,13 @@ output "rds_instance_id" {
   description = "RDS Instance Identifier"
   value       = aws_db_instance.default.id
 }
+
+output "project_name" {
+  description = "Project name (Project tag of the resources)"
+  value       = var.project_name
+}
+
+output "launch_template_id" {
+  description = "Launch Template ID of the app instances"
+  value       = aws_launch_template.app.id
+}